@@ -29,6 +29,159 @@ def makeRuler(n):
             d1 = 0
     return r1 + "\n" + r2 + "\n"
 
+## K-mer hashing. Each base is encoded in 2 bits, so a k-mer hash is an
+## integer that can be updated in constant time when moving along the sequence.
+
+BASECODE = {'A': 0, 'C': 1, 'G': 2, 'T': 3,
+            'a': 0, 'c': 1, 'g': 2, 't': 3}
+
+def kmerHashes(seq, k):
+    """Generates a (pos, fwd, rev) tuple for each k-mer in `seq' that does not
+contain ambiguous bases, where `fwd' and `rev' are the hashes of the k-mer
+and of its reverse complement."""
+    mask = (1 << 2*k) - 1
+    shift = 2*(k - 1)
+    fwd = 0
+    rev = 0
+    valid = 0                   # Number of consecutive unambiguous bases
+    pos = -k
+    for b in seq:
+        pos += 1
+        c = BASECODE.get(b)
+        if c is None:
+            valid = 0
+            continue
+        fwd = ((fwd << 2) | c) & mask
+        rev = (rev >> 2) | ((3 - c) << shift)
+        valid += 1
+        if valid >= k:
+            yield (pos, fwd, rev)
+
+def wordHash(seq, pos, k):
+    """Returns the hash of the k-mer starting at `pos' in `seq', or None if it
+contains ambiguous bases."""
+    h = 0
+    for b in seq[pos:pos+k]:
+        c = BASECODE.get(b)
+        if c is None:
+            return None
+        h = (h << 2) | c
+    return h
+
+def kmerIndex(index, seq, k, binsize, stride, start, end):
+    """Adds to `index' the k-mers of `seq' starting at positions start,
+start+stride, ... before `end'. The index maps each k-mer hash to the bin
+of `binsize' bases it occurs in, or to a set of bins if it occurs in more
+than one. With a stride up to k, any shared region of at least k+stride-1
+bases is detected."""
+    for pos in range(start, min(end, len(seq) - k + 1), stride):
+        h = wordHash(seq, pos, k)
+        if h is None:
+            continue
+        b = pos // binsize
+        bins = index.get(h)
+        if bins is None:
+            index[h] = b
+        elif type(bins) is set:
+            bins.add(b)
+        elif bins != b:
+            index[h] = set([bins, b])
+
+def addHit(counts, cell):
+    if cell in counts:
+        counts[cell] += 1
+    else:
+        counts[cell] = 1
+
+def dotplotCells(index, seq, k, binsize, direct, inverted, start, end):
+    """Looks up the k-mers of `seq' starting between `start' and `end' (which
+should be multiples of `binsize') in `index' (built by kmerIndex()). Counts
+the distinct k-mers shared by each (x, y) cell, where x is a bin in the
+indexed sequence and y a bin in `seq', in the dictionaries `direct' (same
+strand) and `inverted' (reverse complement)."""
+    row = -1
+    seenfwd = set()             # Hashes already looked up in this row
+    seenrev = set()
+    for (pos, fwd, rev) in kmerHashes(seq[start:end+k-1], k):
+        y = (start + pos) // binsize
+        if y != row:
+            row = y
+            seenfwd = set()
+            seenrev = set()
+        if fwd not in seenfwd:
+            seenfwd.add(fwd)
+            bins = index.get(fwd)
+            if type(bins) is set:
+                for x in bins:
+                    addHit(direct, (x, y))
+            elif bins is not None:
+                addHit(direct, (bins, y))
+        if rev not in seenrev:
+            seenrev.add(rev)
+            bins = index.get(rev)
+            if type(bins) is set:
+                for x in bins:
+                    addHit(inverted, (x, y))
+            elif bins is not None:
+                addHit(inverted, (bins, y))
+
+def expectedHits(k, binsize, stride):
+    """Returns the expected number of distinct k-mers shared by chance in a
+cell of random sequence, given that a row contains at most min(binsize, 4^k)
+distinct k-mers, each matching one of the binsize/stride words indexed
+in the cell with probability 1 - (1 - 4^-k)^(binsize/stride)."""
+    nwords = binsize // stride
+    pmatch = -math.expm1(nwords * math.log1p(-4.0**-k))
+    return min(binsize, 4**k) * pmatch
+
+def poissonTail(expected, t):
+    """Returns P(X >= t) for X following a Poisson distribution with mean `expected'."""
+    if expected > 500:          # exp() underflows, use normal approximation
+        return 0.5 * math.erfc((t - expected) / math.sqrt(2 * expected))
+    p = math.exp(-expected)     # P(X = i)
+    tail = 1.0                  # P(X >= i)
+    for i in range(t):
+        tail -= p
+        p *= expected / (i + 1)
+    return max(tail, 0.0)
+
+def hitThreshold(expected, ncells):
+    """Returns the smallest number of hits per cell that, if random hits follow
+a Poisson distribution with mean `expected', fewer than one of `ncells'
+cells is expected to reach by chance."""
+    if expected > 500:          # exp() underflows, use normal approximation
+        return int(math.ceil(expected + 6*math.sqrt(expected)))
+    t = 0
+    p = math.exp(-expected)     # P(X = t)
+    tail = 1.0                  # P(X >= t)
+    while tail * ncells >= 1:
+        tail -= p
+        t += 1
+        p *= expected / t
+    return max(t, 1)
+
+def dotplotBins(len1, len2):
+    """Returns (binsize, width, height) for a dot plot of sequences of lengths
+`len1' (x) and `len2' (y), so that the longest fits in DEF.dotplotSize pixels."""
+    binsize = int(math.ceil(1.0*max(len1, len2, 1)/DEF.dotplotSize))
+    return (binsize,
+            max(1, int(math.ceil(1.0*len1/binsize))),
+            max(1, int(math.ceil(1.0*len2/binsize))))
+
+def dotplotThreshold(k, binsize, ncells):
+    """Returns the minimum number of hits for one of `ncells' cells to be drawn,
+or None if at word size `k' random hits cannot be told apart from a shared
+region. A shared region crossing a cell yields up to binsize/stride distinct
+hits (and no more than 4^k), split between two cells if not aligned, so at
+most half of that can be required."""
+    stride = min(k, binsize)
+    expected = expectedHits(k, binsize, stride)
+    cap = max(1, min(binsize // stride, 4**k) // 2)
+    threshold = min(hitThreshold(expected, ncells), cap)
+    if poissonTail(expected, threshold) > DEF.dotplotNoise:
+        return None
+    return threshold
+
 ## Defaults
 
 class Defaults():
@@ -36,6 +189,11 @@ class Defaults():
     frameWidth = 800
     frameHeight = 600
     rowlen = 60
+    fitRowlen = False           # Adjust rowlen to window width
+    kmerSize = 12               # Word size for dot plots
+    dotplotSize = 500           # Size in pixels of the longest side of dot plots
+    dotplotNoise = 0.01         # Maximum fraction of dot plot cells drawn by chance
+    dotplotChunk = 50000        # Bases processed by each step of dot plot computation
     fontFamily = "Courier"
     fontSize = 12
     confFile = ""
@@ -52,6 +210,7 @@ class Sequence():
     txtlen = 0                  # Length of text representing sequence
     nlines = 0                  # Number of lines in text representing sequence
     rowlen = 60
+    generation = 0              # Incremented every time seq is changed
 
     def __init__(self):
         self.rowlen = DEF.rowlen
@@ -59,8 +218,7 @@ class Sequence():
     def initRandom(self, length):
         self.seqlen = length
         self.seq = "".join([random.choice(['A', 'C', 'G', 'T']) for i in range(length)])
-        self.nlines = int(math.ceil(1.0*length/self.rowlen))
-        self.txtlen = length + self.nlines
+        self.setRowlen(self.rowlen)
 
     def initFasta(self, filename):
         self.filename = filename
@@ -72,15 +230,32 @@ class Sequence():
                     break       # Multi-fasta not handled yet
                 self.seq += line.rstrip("\r\n")
         self.seqlen = len(self.seq)
+        self.setRowlen(self.rowlen)
+
+    def setRowlen(self, rowlen):
+        """Set the number of bases per row to `rowlen', updating the line counts."""
+        self.rowlen = rowlen
         self.nlines = int(math.ceil(1.0*self.seqlen/self.rowlen))
 
+    ## Coordinate mapping. Rows are 1-based and columns 0-based, as in
+    ## Tk text indices; sequence positions are 0-based.
+
+    def rowToSeqpos(self, row):
+        """Returns the sequence position of the first base in `row'."""
+        return (row - 1) * self.rowlen
+
     def indexToSeqpos(self, index):
         (row, col) = index.split(".")
-        return (int(row) - 1) * self.rowlen + int(col)
+        return self.rowToSeqpos(int(row)) + int(col)
 
-    def seqposToIndex(self, seqpos):
-        return "{}.{}".format(1 + int(math.floor(seqpos/self.rowlen)),
-                              1 + (seqpos % self.rowlen))
+    def seqposToIndex(self, seqpos, end=False):
+        """Returns the text index for `seqpos'. If `end' is True, `seqpos' is an
+exclusive end position, so a position falling on a row boundary is mapped
+to the end of the previous row instead of the start of the next one."""
+        (row, col) = divmod(seqpos, self.rowlen)
+        if end and col == 0 and row > 0:
+            return "%d.%d" % (row, self.rowlen)
+        return "%d.%d" % (row + 1, col)
 
     def translateBase(self, base):
         nucmap = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A',
@@ -112,6 +287,7 @@ class Sequence():
             for i in range(self.seqlen):
                 newseq[i] = self.translateBase(seq[i])
         self.seq = newseq
+        self.generation += 1
         return newseq
             
 ## Sequence info object
@@ -137,7 +313,7 @@ class Seqinfo():
 ## Region representing highlighted region
 
 class Region():
-    mark1 = ""                  # m1
+    mark1 = ""                  # m1, or None for search matches
     mark2 = ""
     index1 = ""                 # r.c
     index2 = ""
@@ -268,6 +444,202 @@ class RandomSeqDialog(Dialog):
         self.result = {'length': self.size.get(),
                        'name': self.name.get()}
 
+class RowlenDialog(Dialog):
+    rowlen = None
+
+    def body(self, master):
+        self.rowlen = tk.IntVar()
+        self.rowlen.set(self.extra.get('rowlen', DEF.rowlen))
+
+        master.columnconfigure(1, weight=1)
+        tk.Label(master, text='Bases per row:', anchor=tk.W).grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        e = tk.Entry(master, width=10, textvariable=self.rowlen, justify=tk.RIGHT)
+        e.grid(row=0, column=1, sticky=tk.E, padx=5, pady=5)
+        return e
+
+    def validate(self):
+        try:
+            return self.rowlen.get() > 0
+        except ValueError:
+            return 0
+
+    def apply(self):
+        self.result = {'rowlen': self.rowlen.get()}
+
+class DotPlotDialog(Dialog):
+    kmer = None
+    filename = None
+
+    def body(self, master):
+        self.kmer = tk.IntVar()
+        self.kmer.set(DEF.kmerSize)
+        self.filename = tk.StringVar()
+
+        master.columnconfigure(1, weight=1)
+        tk.Label(master, text='Word size:', anchor=tk.W).grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        e = tk.Entry(master, width=10, textvariable=self.kmer, justify=tk.RIGHT)
+        e.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
+        tk.Label(master, text='Compare with:', anchor=tk.W).grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
+        tk.Entry(master, width=30, textvariable=self.filename).grid(row=1, column=1, sticky=tk.W+tk.E, padx=5, pady=5)
+        tk.Button(master, text="Browse...", command=self.browse).grid(row=1, column=2, padx=5, pady=5)
+        tk.Label(master, text='(leave empty to compare the sequence with itself)', anchor=tk.W).grid(row=2, column=0, columnspan=3, sticky=tk.W, padx=5)
+        return e
+
+    def browse(self):
+        filename = tkFileDialog.askopenfilename(title="Select file containing sequence", parent=self)
+        if filename:
+            self.filename.set(filename)
+
+    def validate(self):
+        try:
+            k = self.kmer.get()
+        except ValueError:
+            return 0
+        filename = self.filename.get()
+        if k < 1 or k > 32:
+            tkMessageBox.showerror("Dot plot", "Word size should be between 1 and 32.", parent=self)
+            return 0
+        if filename and not os.path.isfile(filename):
+            tkMessageBox.showerror("Dot plot", "File {} does not exist.".format(filename), parent=self)
+            return 0
+        return 1
+
+    def apply(self):
+        self.result = {'kmer': self.kmer.get(),
+                       'filename': self.filename.get()}
+
+## Dot plot window
+
+class DotPlotWindow(tk.Toplevel):
+    """Window showing a dot plot of the sequence currently displayed by `app'
+(x axis) against `seqobj2' (y axis). Each pixel represents a square of
+`binsize' bases, so that the longest sequence fits in DEF.dotplotSize pixels.
+The plot is computed in steps of DEF.dotplotChunk bases scheduled with
+after(), so the application stays responsive."""
+    app = None
+    seqobj1 = None
+    seqobj2 = None
+    generation = 0              # Generation of seqobj1 the plot was built from
+    kmer = 0
+    binsize = 1
+    stride = 1                  # Distance between indexed words in seqobj1
+    width = 0
+    height = 0
+    threshold = 1               # Minimum number of shared k-mers to draw a cell
+    canvas = None
+    image = None
+    status = None               # Progress and summary
+    position = None             # Coordinates under the mouse
+    job = None                  # Generator performing the computation
+    jobId = None                # Pending after() call
+
+    def __init__(self, app, seqobj2, kmer):
+        tk.Toplevel.__init__(self, app)
+        self.app = app
+        self.seqobj1 = app.sequence
+        self.seqobj2 = seqobj2
+        self.generation = self.seqobj1.generation
+        self.kmer = kmer
+        self.title("Dot plot - {} vs {}".format(self.seqobj1.name, seqobj2.name))
+
+        (self.binsize, self.width, self.height) = dotplotBins(self.seqobj1.seqlen, seqobj2.seqlen)
+        self.stride = min(kmer, self.binsize)
+        self.threshold = dotplotThreshold(kmer, self.binsize, self.width * self.height)
+
+        tk.Label(self, text="x: {} ({} bp)    y: {} ({} bp)".format(self.seqobj1.name, self.seqobj1.seqlen, seqobj2.name, seqobj2.seqlen),
+                 anchor=tk.W).grid(row=0, column=0, columnspan=2, sticky=tk.W+tk.E)
+        self.canvas = tk.Canvas(self, width=self.width, height=self.height, bg="white", highlightthickness=0, cursor="crosshair")
+        self.canvas.grid(row=1, column=0, columnspan=2, padx=5, pady=5)
+        self.status = tk.Label(self, text="", anchor=tk.W, relief=tk.RIDGE)
+        self.status.grid(row=2, column=0, sticky=tk.W+tk.E)
+        self.position = tk.Label(self, text="", anchor=tk.E, relief=tk.RIDGE, width=30)
+        self.position.grid(row=2, column=1, sticky=tk.W+tk.E)
+        self.columnconfigure(0, weight=1)
+
+        self.canvas.bind("<Button-1>", self.clicked)
+        self.canvas.bind("<Motion>", self.moved)
+        self.canvas.bind("<Leave>", lambda ev: self.position.config(text=""))
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.job = self.compute()
+        self.jobId = self.after_idle(self.step)
+
+    def step(self):
+        try:
+            next(self.job)
+            self.jobId = self.after(1, self.step)
+        except StopIteration:
+            self.jobId = None
+
+    def close(self):
+        if self.jobId:
+            self.after_cancel(self.jobId)
+        self.destroy()
+
+    def compute(self):
+        """Generator that computes the plot, yielding after each chunk."""
+        k = self.kmer
+        binsize = self.binsize
+        seq1 = self.seqobj1.seq     # Keep working on these even if the
+        seq2 = self.seqobj2.seq     # sequences are transformed meanwhile
+        total = len(seq1) + len(seq2)
+
+        index = {}
+        chunk = self.stride * max(1, DEF.dotplotChunk // self.stride)
+        for start in range(0, len(seq1), chunk):
+            kmerIndex(index, seq1, k, binsize, self.stride, start, start + chunk)
+            self.status.config(text="Indexing... {}%".format(100 * min(start + chunk, len(seq1)) // total))
+            yield
+
+        direct = {}
+        inverted = {}
+        chunk = binsize * max(1, DEF.dotplotChunk // binsize)
+        for start in range(0, len(seq2), chunk):
+            dotplotCells(index, seq2, k, binsize, direct, inverted, start, start + chunk)
+            self.status.config(text="Comparing... {}%".format(100 * (len(seq1) + min(start + chunk, len(seq2))) // total))
+            yield
+
+        self.draw(direct, inverted)
+
+    def draw(self, direct, inverted):
+        """Render the cells reaching the threshold into an image, one pixel per cell."""
+        grid = [["#ffffff"] * self.width for y in range(self.height)]
+        ninverted = 0
+        ndirect = 0
+        for ((x, y), n) in inverted.iteritems():
+            if n >= self.threshold:
+                grid[y][x] = "#ff0000"
+                ninverted += 1
+        for ((x, y), n) in direct.iteritems():
+            if n >= self.threshold:
+                grid[y][x] = "#000000"
+                ndirect += 1
+        self.image = tk.PhotoImage(width=self.width, height=self.height)
+        self.image.put(" ".join(["{" + " ".join(row) + "}" for row in grid]))
+        self.canvas.create_image(0, 0, image=self.image, anchor=tk.NW)
+        self.status.config(text="k = {}, 1 pixel = {} bp, >= {} hits per cell: {} direct, {} inverted (red)".format(
+            self.kmer, self.binsize, self.threshold, ndirect, ninverted))
+
+    def cellRange(self, cell, seqobj):
+        """Returns the range of positions in `seqobj' covered by `cell'."""
+        start = min(cell * self.binsize, seqobj.seqlen)
+        return (start, min(start + self.binsize, seqobj.seqlen))
+
+    def isStale(self):
+        return self.app.sequence is not self.seqobj1 or self.seqobj1.generation != self.generation
+
+    def moved(self, event):
+        (x1, x2) = self.cellRange(event.x, self.seqobj1)
+        (y1, y2) = self.cellRange(event.y, self.seqobj2)
+        self.position.config(text="x: {} - {}    y: {} - {}".format(x1 + 1, x2, y1 + 1, y2))
+
+    def clicked(self, event):
+        if self.isStale():
+            self.position.config(text="Plot is out of date")
+            return
+        if 0 <= event.x < self.width:
+            (start, end) = self.cellRange(event.x, self.seqobj1)
+            self.app.showRegion(start, end)
+
 ## Top-level application object 
 
 APP = None
@@ -283,6 +655,9 @@ class Application(tk.Frame):
     rulerheight = 2
     sequence = None             # Sequence object
     seqinfo = None
+    posrows = None              # Rows of poswin already filled in
+    fitrows = None              # Adjust rowlen to window width?
+    resizeJob = None            # Pending reflow after window resize
 
     # Marks
     markcnt = 0                 # Counter for mark names
@@ -315,10 +690,13 @@ class Application(tk.Frame):
         self.mainwin.yview_moveto(first)
         self.poswin.yview_moveto(first)
         self.uniscrollbar.set(first, last)
+        self.refreshPositions()
 
     def createMenus(self):
         top = self.winfo_toplevel()
         self.MB = tk.Menu(top)
+        self.fitrows = tk.BooleanVar()
+        self.fitrows.set(DEF.fitRowlen)
 
         filemenu = tk.Menu(self.MB, tearoff=0)
         filemenu.add_command(label="Open...", command=self.openFile, underline=0, accelerator="F9")
@@ -345,6 +723,11 @@ class Application(tk.Frame):
         seqmenu.add_command(label="Details...", underline=0)
         seqmenu.add_cascade(label="Transform", underline=0, menu=transmenu)
         seqmenu.add_command(label="Translate", underline=0)
+        seqmenu.add_separator()
+        seqmenu.add_command(label="Row length...", underline=0, command=self.changeRowlen)
+        seqmenu.add_checkbutton(label="Fit to window", underline=0, variable=self.fitrows, command=self.fitToWindow)
+        seqmenu.add_separator()
+        seqmenu.add_command(label="Dot plot...", underline=1, command=self.dotPlot)
         self.MB.add_cascade(label="Sequence", underline=0, menu=seqmenu)
         top.config(menu=self.MB)
 
@@ -424,6 +807,7 @@ class Application(tk.Frame):
 
         # Key bindings
         self.mainwin.bind("<<Selection>>", self.selectionDone)
+        self.mainwin.bind("<Configure>", self.windowResized)
         top.bind("<Home>", lambda ev: self.scrollTo(0))
         top.bind("<End>", lambda ev: self.scrollTo(1))
         top.bind("<Prior>", lambda ev: self.scrollTo(2))
@@ -479,18 +863,40 @@ Use File -> Open... to load a sequence file.
         mw.config(state=tk.DISABLED)
         
     def initialize(self, seqobj):
-        """Initialize the viewer with the sequence contained in `seqobj'."""
+        """Initialize the viewer with the sequence contained in `seqobj'.
+Highlights are kept if `seqobj' is the sequence already displayed (e.g.
+after a transformation)."""
+        if seqobj is not self.sequence:
+            self.clearHighlights()
         self.sequence = seqobj
+        if self.fitrows.get():
+            seqobj.setRowlen(self.fittingRowlen())
+        self.layoutSequence()
+
+        self.seqinfo.filetype.set("fasta")
+        self.seqinfo.seqlen.set("{} bp".format(self.sequence.seqlen))
+        self.seqinfo.seqname.set(self.sequence.name)
+        self.seqinfo.filename.set(self.sequence.filename)
+
+    def layoutSequence(self):
+        """Fill the ruler, position and sequence windows using the current
+rowlen of the sequence. Positions are only filled in for visible rows,
+see refreshPositions()."""
+        seqobj = self.sequence
         seq = seqobj.seq
+        rowlen = seqobj.rowlen
 
-        self.ruler = makeRuler(self.sequence.rowlen)
+        self.ruler = makeRuler(rowlen)
 
         dw = self.dummywin
+        dw.config(state=tk.NORMAL)
         dw.delete(1.0, tk.END)
         dw.config(height=self.rulerheight)
         dw.insert(tk.INSERT, "\n"*self.rulerheight)
+        dw.config(state=tk.DISABLED)
 
         rw = self.rulerwin
+        rw.config(state=tk.NORMAL)
         rw.delete(1.0, tk.END)
         rw.config(height=self.rulerheight)
         rw.insert(tk.INSERT, self.ruler)
@@ -502,34 +908,72 @@ Use File -> Open... to load a sequence file.
         mw = self.mainwin
 
         pw.config(state=tk.NORMAL)
-        numbers = "\n".join([str(x*self.sequence.rowlen+1) for x in range(0, self.sequence.nlines)])
         pw.delete(1.0, tk.END)
-        pw.insert(tk.INSERT, numbers)
+        pw.insert(tk.INSERT, "\n"*(seqobj.nlines - 1))
         pw.tag_configure("right", justify='right')
-        pw.tag_add("right", 1.0, "end")
         pw.config(state=tk.DISABLED)
+        self.posrows = [False] * (seqobj.nlines + 1)
 
+        rows = ["".join(seq[p:p+rowlen]) for p in range(0, seqobj.seqlen, rowlen)]
+        if rows:
+            rows[-1] = rows[-1].ljust(rowlen)
         mw.config(state=tk.NORMAL)
         mw.delete(1.0, tk.END)
-
-        i = 0
-        for j in range(self.sequence.seqlen):
-            mw.insert(tk.INSERT, seq[j])
-            i += 1
-            if i == seqobj.rowlen:
-                mw.insert(tk.INSERT, "\n")
-                i = 0
-        while i < seqobj.rowlen:
-            mw.insert(tk.INSERT, " ")
-            i += 1
+        mw.insert(tk.INSERT, "\n".join(rows))
         mw.tag_configure("center", justify='center')
         mw.tag_add("center", 1.0, "end")
         mw.config(state=tk.DISABLED)
 
-        self.seqinfo.filetype.set("fasta")
-        self.seqinfo.seqlen.set("{} bp".format(self.sequence.seqlen))
-        self.seqinfo.seqname.set(self.sequence.name)
-        self.seqinfo.filename.set(self.sequence.filename)
+        self.redrawHighlights()
+        self.refreshPositions()
+
+    def refreshPositions(self):
+        """Fill in the position column for the rows currently visible in mainwin."""
+        seqobj = self.sequence
+        if not self.posrows:
+            return
+        mw = self.mainwin
+        first = int(mw.index("@0,0").split(".")[0])
+        last = int(mw.index("@0,{}".format(mw.winfo_height())).split(".")[0])
+        pw = None
+        for row in range(first, min(last, seqobj.nlines) + 1):
+            if not self.posrows[row]:
+                if not pw:
+                    pw = self.poswin
+                    pw.config(state=tk.NORMAL)
+                pw.insert("%d.0" % row, str(seqobj.rowToSeqpos(row) + 1), "right")
+                self.posrows[row] = True
+        if pw:
+            pw.config(state=tk.DISABLED)
+
+    def reflow(self, rowlen):
+        """Change the number of bases per row to `rowlen', keeping the first
+visible base at the top of the window."""
+        seqobj = self.sequence
+        if not seqobj or rowlen < 1 or rowlen == seqobj.rowlen:
+            return
+        top = seqobj.indexToSeqpos(self.mainwin.index("@0,0"))
+        seqobj.setRowlen(rowlen)
+        self.layoutSequence()
+        self.mainwin.yview(seqobj.seqposToIndex(top))
+        self.poswin.yview_moveto(self.mainwin.yview()[0])
+        self.refreshPositions()
+
+    def fittingRowlen(self):
+        """Returns the largest multiple of 10 bases that fits in the width of mainwin."""
+        mw = self.mainwin
+        width = mw.winfo_width()
+        if width <= 1:          # Not mapped yet
+            return DEF.rowlen
+        width -= 2*(int(mw.cget("borderwidth")) + int(mw.cget("highlightthickness")) + int(mw.cget("padx")))
+        ncols = width // self.seqfont.measure("A")
+        return max(10, ncols - ncols % 10)
+
+    def windowResized(self, event=None):
+        if self.fitrows.get():
+            if self.resizeJob:
+                self.after_cancel(self.resizeJob)
+            self.resizeJob = self.after(200, self.fitToWindow)
 
     ## Commands
 
@@ -548,6 +992,37 @@ Use File -> Open... to load a sequence file.
             SO.name = result['name']
             self.initialize(SO)
 
+    def changeRowlen(self, event=None):
+        if self.sequence:
+            result = RowlenDialog(self, title="Row length", extra={'rowlen': self.sequence.rowlen}).result
+            if result:
+                self.fitrows.set(False)
+                self.reflow(result['rowlen'])
+
+    def fitToWindow(self, event=None):
+        self.resizeJob = None
+        if self.fitrows.get():
+            self.reflow(self.fittingRowlen())
+
+    def dotPlot(self, event=None):
+        if self.sequence:
+            result = DotPlotDialog(self, title="Dot plot").result
+            if result:
+                if result['filename']:
+                    SO = Sequence()
+                    SO.initFasta(result['filename'])
+                else:
+                    SO = self.sequence
+                k = result['kmer']
+                (binsize, width, height) = dotplotBins(self.sequence.seqlen, SO.seqlen)
+                if dotplotThreshold(k, binsize, width * height) is None:
+                    kmin = k
+                    while kmin < 32 and dotplotThreshold(kmin, binsize, width * height) is None:
+                        kmin += 1
+                    tkMessageBox.showerror("Dot plot", "Word size {} is too small for sequences of this length: random matches would fill the plot. Use a word size of at least {}.".format(k, kmin), parent=self)
+                    return
+                DotPlotWindow(self, SO, k)
+
     def selectAll(self, event=None):
         self.mainwin.tag_add('sel', '1.0', tk.END)
 
@@ -571,15 +1046,32 @@ Use File -> Open... to load a sequence file.
         mw.mark_set(m2, pos2)
         idx1 = mw.index(m1)
         idx2 = mw.index(m2)
-        if not seqpos1:
+        if seqpos1 is None:
             seqpos1 = seqobj.indexToSeqpos(idx1)
-        if not seqpos2:
+        if seqpos2 is None:
             seqpos2 = seqobj.indexToSeqpos(idx2)
         reg = Region(m1, m2, idx1, idx2, seqpos1, seqpos2)
         self.hilightmarks.append(reg)
         self.nhilights += 1
         mw.tag_add("hilight", idx1, idx2)
 
+    def redrawHighlights(self):
+        """Move the marks and tags of all highlighted regions to the text indices
+corresponding to their sequence positions (e.g. after a change of rowlen)."""
+        mw = self.mainwin
+        seqobj = self.sequence
+        ranges = []
+        for reg in self.hilightmarks:
+            reg.index1 = seqobj.seqposToIndex(reg.seqpos1)
+            reg.index2 = seqobj.seqposToIndex(reg.seqpos2, end=True)
+            if reg.mark1:
+                mw.mark_set(reg.mark1, reg.index1)
+                mw.mark_set(reg.mark2, reg.index2)
+            ranges.append(reg.index1)
+            ranges.append(reg.index2)
+        if ranges:
+            mw.tag_add("hilight", *ranges)
+
     def highlightSelection(self, event=None):
         self.addHighlight(tk.SEL_FIRST, tk.SEL_LAST)
         self.sortHilightRegions()
@@ -587,8 +1079,9 @@ Use File -> Open... to load a sequence file.
     def clearHighlights(self, event=None):
         mw = self.mainwin
         for reg in self.hilightmarks:
-            mw.mark_unset(reg.mark1)
-            mw.mark_unset(reg.mark2)
+            if reg.mark1:
+                mw.mark_unset(reg.mark1)
+                mw.mark_unset(reg.mark2)
         self.hilightmarks = []
         self.nhilights = 0
         self.visibleHilight = 0
@@ -616,11 +1109,18 @@ Use File -> Open... to load a sequence file.
         target = self.seqinfo.search.get()
         cp = re.compile(target, flags=re.I)
         matches = re.finditer(cp, sq.seq)
-        for m in matches:
-            start = sq.seqposToIndex(m.start()-1)
-            end   = sq.seqposToIndex(m.end()-1)
-            self.addHighlight(start, end, m.start(), m.end())
+        ranges = []
+        for m in matches:       # Match regions need no marks, they are placed by seqpos
+            (p, q) = m.span()
+            start = sq.seqposToIndex(p)
+            end   = sq.seqposToIndex(q, end=True)
+            self.hilightmarks.append(Region(None, None, start, end, p, q))
+            ranges.append(start)
+            ranges.append(end)
             nmatches += 1
+        self.nhilights += nmatches
+        if ranges:
+            mw.tag_add("hilight", *ranges)
         self.sortHilightRegions()
         self.locateHilight()
 
@@ -631,9 +1131,14 @@ Use File -> Open... to load a sequence file.
             if which and which >= 0 and which < self.nhilights:
                 self.visibleHilight = which
             reg = self.hilightmarks[self.visibleHilight]
-            self.mainwin.see(reg.index1)
+            self.showRegion(reg.seqpos1, reg.seqpos2)
             self.seqinfo.visiblereg.set("match {} / {}".format(self.visibleHilight + 1, self.nhilights))
-            self.seqinfo.selected.set("{} - {}".format(reg.seqpos1 + 1, reg.seqpos2))
+
+    def showRegion(self, seqpos1, seqpos2):
+        """Scroll mainwin to make position `seqpos1' visible, and display the
+region from `seqpos1' to `seqpos2' in the Selection field."""
+        self.mainwin.see(self.sequence.seqposToIndex(seqpos1))
+        self.seqinfo.selected.set("{} - {}".format(seqpos1 + 1, seqpos2))
 
     def nextMatch(self, event=None):
         self.visibleHilight += 1